@@ -1,6 +1,31 @@
 """Supervisor-worker deep research via programmatic distillation."""
 
-from distill.models import ModelHandler, OpenAIHandler, VLLMHandler
-from distill.orchestrator import run
+import importlib
 
-__all__ = ["run", "ModelHandler", "OpenAIHandler", "VLLMHandler"]
+from distill.cache import DiskCache, SemanticCache
+from distill.chunking import chunk_by_paragraph, chunk_by_section, chunk_by_tokens
+
+__all__ = [
+    "run", "arun", "ModelHandler", "OpenAIHandler", "VLLMHandler",
+    "DiskCache", "SemanticCache",
+    "chunk_by_section", "chunk_by_paragraph", "chunk_by_tokens",
+]
+
+# Handlers and the orchestrator pull in the openai/httpx import chain; resolve
+# them on first access so `import distill` (and CLI --help) stays fast.
+_LAZY = {
+    "ModelHandler": "distill.models",
+    "OpenAIHandler": "distill.models",
+    "VLLMHandler": "distill.models",
+    "run": "distill.orchestrator",
+    "arun": "distill.orchestrator",
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY.get(name)
+    if module_name is None:
+        raise AttributeError(f"module 'distill' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,115 @@
+"""Persistent disk-backed cache for model responses."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+_DEFAULT_CACHE_DIR = Path.home() / ".cache" / "supervisor_distill"
+
+
+class DiskCache:
+    """Content-addressed response cache surviving across processes.
+
+    Keys are the SHA-256 of (model, messages, sampling kwargs); each entry is
+    a small JSON file sharded by key prefix under `cache_dir`. Re-running an
+    experiment with identical prompts turns warm calls into file reads.
+
+    Sampled (temperature > 0) responses are not cached unless
+    `cache_nondeterministic=True`, since replaying them silently collapses
+    the sampling distribution.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | os.PathLike | None = None,
+        cache_nondeterministic: bool = False,
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir else _DEFAULT_CACHE_DIR
+        self.cache_nondeterministic = cache_nondeterministic
+
+    @staticmethod
+    def make_key(model: str, messages: list[dict], kwargs: dict) -> str:
+        payload = json.dumps(
+            {"model": model, "messages": messages, "kwargs": kwargs},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def should_cache(self, kwargs: dict) -> bool:
+        return self.cache_nondeterministic or not kwargs.get("temperature", 0)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> dict | None:
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def set(self, key: str, value: dict) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial entry.
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(value, f)
+        os.replace(tmp, path)
+
+
+class SemanticCache:
+    """Embedding-based cache recognizing near-duplicate prompts.
+
+    Exact hashing misses prompts that differ only in chunk ordering or other
+    incidental detail; this layer embeds the prompt text and returns the
+    stored response of the nearest neighbour when cosine similarity clears
+    `threshold`.
+
+    Requires the optional ``sentence-transformers`` and ``faiss`` packages
+    (imported lazily, as with the vLLM handler).
+
+    Args:
+        model_name: Sentence-transformers encoder to embed prompts with.
+        threshold: Minimum cosine similarity for a hit. Conservative by
+            default — lower it only if near-duplicates are truly interchangeable.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        threshold: float = 0.97,
+    ):
+        from sentence_transformers import SentenceTransformer
+        import faiss
+
+        self.threshold = threshold
+        self._encoder = SentenceTransformer(model_name)
+        self._index = faiss.IndexFlatIP(self._encoder.get_sentence_embedding_dimension())
+        self._entries: list[dict] = []
+        self._lock = threading.Lock()
+
+    def _embed(self, texts: list[str]):
+        return self._encoder.encode(
+            texts, batch_size=64, normalize_embeddings=True
+        ).astype("float32")
+
+    def get(self, text: str) -> dict | None:
+        vec = self._embed([text])
+        with self._lock:
+            if self._index.ntotal == 0:
+                return None
+            scores, ids = self._index.search(vec, 1)
+            if scores[0][0] >= self.threshold:
+                return self._entries[ids[0][0]]
+        return None
+
+    def add(self, text: str, value: dict) -> None:
+        vec = self._embed([text])
+        with self._lock:
+            self._index.add(vec)
+            self._entries.append(value)
@@ -0,0 +1,72 @@
+"""Context chunking helpers for splitting long documents into worker-sized pieces."""
+
+from __future__ import annotations
+
+# Compiled once at import; these run over hundreds-of-KB contexts thousands
+# of times per experiment, so skip the per-call re-cache lookup.
+import re
+
+_SECTION_RE = re.compile(r"\n(?=={3,}|#{3,}\s)")
+_PARA_RE = re.compile(r"\n\s*\n")
+
+
+def chunk_by_section(text: str) -> list[str]:
+    """Split on section headings (`===`-style or markdown `###`)."""
+    return [c for c in _SECTION_RE.split(text) if c.strip()]
+
+
+def chunk_by_paragraph(text: str, min_length: int = 0) -> list[str]:
+    """Split on blank lines, merging consecutive paragraphs up to `min_length`.
+
+    Merging accumulates parts in a list and joins once per emitted chunk, so
+    building stays linear on 100KB+ contexts.
+    """
+    paras = [c for c in _PARA_RE.split(text) if c.strip()]
+    if min_length <= 0:
+        return paras
+    chunks: list[str] = []
+    buf_parts: list[str] = []
+    buf_len = 0
+    for para in paras:
+        buf_parts.append(para)
+        buf_len += len(para) + 2
+        if buf_len >= min_length:
+            chunks.append("\n\n".join(buf_parts))
+            buf_parts.clear()
+            buf_len = 0
+    if buf_parts:
+        chunks.append("\n\n".join(buf_parts))
+    return chunks
+
+
+_ENCODER = None
+
+
+def _get_encoder():
+    """Lazy tiktoken encoder singleton; None when tiktoken isn't installed."""
+    global _ENCODER
+    if _ENCODER is None:
+        try:
+            import tiktoken
+        except ImportError:
+            return None
+        _ENCODER = tiktoken.get_encoding("cl100k_base")
+    return _ENCODER
+
+
+def chunk_by_tokens(text: str, chunk_size: int = 1500, overlap: int = 50) -> list[str]:
+    """Split into fixed-size token windows with overlap.
+
+    Slices on real token boundaries when tiktoken is available, so chunks fill
+    the worker context instead of overshooting on code-heavy text. Without
+    tiktoken, falls back to character windows at ~4 chars per token.
+    """
+    if chunk_size <= overlap:
+        raise ValueError("chunk_size must exceed overlap")
+    step = chunk_size - overlap
+    enc = _get_encoder()
+    if enc is None:
+        chars, char_step = chunk_size * 4, step * 4
+        return [text[s:s + chars] for s in range(0, len(text), char_step)]
+    toks = enc.encode(text)
+    return [enc.decode(toks[s:s + chunk_size]) for s in range(0, len(toks), step)]
@@ -4,88 +4,203 @@ from __future__ import annotations
 
 import json
 import os
+import queue
+import threading
+import time
 from datetime import datetime, timezone
 from typing import Any, TYPE_CHECKING
 
+try:
+    import orjson
+
+    # Options handle stray numpy scalars / non-str keys (e.g. vLLM token counts).
+    _ORJSON_OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def _dumps(obj: dict) -> bytes:
+        return orjson.dumps(obj, option=_ORJSON_OPTS)
+except ImportError:
+    def _dumps(obj: dict) -> bytes:
+        return json.dumps(obj).encode()
+
 if TYPE_CHECKING:
     from distill.models import LMResponse
     from distill.repl import ExecResult
 
 
-def _now() -> str:
+def _now_ns() -> int:
+    # Hot-path timestamp: one clock read, no datetime construction/formatting.
+    return time.time_ns()
+
+
+def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def _write(f, obj: dict) -> None:
-    f.write(json.dumps(obj) + "\n")
-    f.flush()
+# Max events drained per batch on the writer thread.
+_DRAIN_BATCH = 100
+
+
+class NullLogger:
+    """No-op logger used when logging is disabled, so call sites stay branch-free."""
+
+    def log_task_input(self, *args, **kwargs) -> None: pass
+    def log_task_output(self, *args, **kwargs) -> None: pass
+    def log_supervisor(self, *args, **kwargs) -> None: pass
+    def log_worker(self, *args, **kwargs) -> None: pass
+    def log_worker_batch(self, *args, **kwargs) -> None: pass
+    def log_repl(self, *args, **kwargs) -> None: pass
+    def flush(self) -> None: pass
+    def close(self) -> None: pass
 
 
 class RunLogger:
-    """Writes events to supervisor.jsonl, worker.jsonl, repl.jsonl, and task.jsonl."""
+    """Writes events to supervisor.jsonl, worker.jsonl, repl.jsonl, and task.jsonl.
+
+    Events are serialized on the calling thread but written by a background
+    writer thread in batches, so hot paths never stall on file I/O. Callers
+    that need durability mid-run should call `flush()` (the orchestrator does
+    so at iteration boundaries).
+    """
 
     def __init__(self, log_dir: str):
         os.makedirs(log_dir, exist_ok=True)
         self._log_dir = log_dir
-        self._supervisor_f = open(os.path.join(log_dir, "supervisor.jsonl"), "a")
-        self._worker_f = open(os.path.join(log_dir, "worker.jsonl"), "a")
-        self._repl_f = open(os.path.join(log_dir, "repl.jsonl"), "a")
-        self._task_f = open(os.path.join(log_dir, "task.jsonl"), "a")
-
-    def log_task_input(self, query: str, context: Any, label: str | None = None) -> None:
-        """Log the task input (query, context, optional label)."""
-        _write(self._task_f, {
+        # Raw O_APPEND fds: appends are single atomic syscalls on the writer
+        # thread with none of io.BufferedWriter's locking, which matters when
+        # many per-example loggers run in one process.
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+        self._supervisor_f = os.open(os.path.join(log_dir, "supervisor.jsonl"), flags, 0o644)
+        self._worker_f = os.open(os.path.join(log_dir, "worker.jsonl"), flags, 0o644)
+        self._repl_f = os.open(os.path.join(log_dir, "repl.jsonl"), flags, 0o644)
+        self._task_f = os.open(os.path.join(log_dir, "task.jsonl"), flags, 0o644)
+        self._supervisor_msg_count = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._drain_loop, daemon=True)
+        self._writer.start()
+
+    def _put(self, f, obj: dict) -> None:
+        self._queue.put((f, _dumps(obj) + b"\n"))
+
+    def _drain_loop(self) -> None:
+        """Drain queued lines in batches: one os.write per file per batch."""
+        while True:
+            item = self._queue.get()
+            stop = item is None
+            batches: dict[int, list[bytes]] = {}
+            if not stop:
+                fd, line = item
+                batches.setdefault(fd, []).append(line)
+            taken = 1
+            while taken < _DRAIN_BATCH:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if item is None:
+                    stop = True
+                    continue
+                fd, line = item
+                batches.setdefault(fd, []).append(line)
+            for fd, lines in batches.items():
+                os.write(fd, b"".join(lines))
+            for _ in range(taken):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def log_task_input(self, query: str, context: str, label: str | None = None) -> None:
+        """Log the task input (query, pre-stringified context, optional label).
+
+        The caller serializes `context` once and reuses that string; doing it
+        here would re-stringify structured contexts per logger.
+        """
+        self._put(self._task_f, {
             "type": "input",
             "query": query,
-            "context": context if isinstance(context, str) else str(context),
+            "context": context,
             "label": label or "",
-            "timestamp": _now(),
+            "ts_ns": _now_ns(),
         })
 
     def log_task_output(self, answer: Any) -> None:
         """Log the task output (FINAL answer)."""
-        _write(self._task_f, {
+        self._put(self._task_f, {
             "type": "output",
             "answer": answer if isinstance(answer, str) else str(answer),
-            "timestamp": _now(),
+            "ts_ns": _now_ns(),
         })
 
     def log_supervisor(self, step: int, messages: list[dict], response: LMResponse) -> None:
-        _write(self._supervisor_f, {
+        """Log a supervisor turn.
+
+        Only messages appended since the previous supervisor log are written
+        (`new_messages`); the history is append-only, so readers reconstruct
+        the full message list at step N by concatenating `new_messages` over
+        steps 0..N. Avoids re-serializing the whole history every step.
+        """
+        new_messages = messages[self._supervisor_msg_count:]
+        self._supervisor_msg_count = len(messages)
+        self._put(self._supervisor_f, {
             "step": step,
-            "timestamp": _now(),
+            "ts_ns": _now_ns(),
+            # Supervisor events are infrequent; keep a human-readable timestamp.
+            "ts_iso": _now_iso(),
             "model": response.model,
-            "messages": messages,
+            "new_messages": new_messages,
             "response": response.text,
             "usage": {"input_tokens": response.usage.input_tokens, "output_tokens": response.usage.output_tokens},
             "elapsed": response.elapsed,
         })
 
     def log_worker(self, step: int, prompt: str, response: LMResponse) -> None:
-        _write(self._worker_f, {
+        self._put(self._worker_f, {
             "step": step,
-            "timestamp": _now(),
+            "ts_ns": _now_ns(),
             "model": response.model,
             "prompt": prompt,
             "response": response.text,
             "usage": {"input_tokens": response.usage.input_tokens, "output_tokens": response.usage.output_tokens},
             "elapsed": response.elapsed,
+            "cached": response.cached,
         })
 
     def log_worker_batch(self, step: int, prompts: list[str], responses: list[LMResponse]) -> None:
-        for prompt, response in zip(prompts, responses):
-            self.log_worker(step, prompt, response)
+        # Serialize the whole batch (one shared timestamp) and enqueue it as a
+        # single item, so K worker calls cost one queue op and one os.write.
+        ts_ns = _now_ns()
+        lines = [
+            _dumps({
+                "step": step,
+                "ts_ns": ts_ns,
+                "model": response.model,
+                "prompt": prompt,
+                "response": response.text,
+                "usage": {"input_tokens": response.usage.input_tokens, "output_tokens": response.usage.output_tokens},
+                "elapsed": response.elapsed,
+                "cached": response.cached,
+            })
+            for prompt, response in zip(prompts, responses)
+        ]
+        self._queue.put((self._worker_f, b"\n".join(lines) + b"\n"))
 
     def log_repl(self, step: int, code: str, result: ExecResult) -> None:
-        _write(self._repl_f, {
+        self._put(self._repl_f, {
             "step": step,
-            "timestamp": _now(),
+            "ts_ns": _now_ns(),
             "code": code,
             "stdout": result.stdout,
             "stderr": result.stderr,
             "elapsed": result.elapsed,
         })
 
+    def flush(self) -> None:
+        # Wait for the writer thread to drain everything enqueued so far;
+        # os.write hits the kernel directly, so drained means on disk cache.
+        self._queue.join()
+
     def close(self) -> None:
-        for f in (self._supervisor_f, self._worker_f, self._repl_f, self._task_f):
-            f.close()
+        self._queue.put(None)
+        self._writer.join()
+        for fd in (self._supervisor_f, self._worker_f, self._repl_f, self._task_f):
+            os.close(fd)
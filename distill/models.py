@@ -3,32 +3,107 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import os
+import random
+import threading
 import time
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
 from dataclasses import dataclass, field
 from typing import Any
 
+import httpx
+import openai
 from openai import AsyncOpenAI
 
+from distill.cache import DiskCache, SemanticCache
+
+# Handlers pointed at the same endpoint share one client (and thus one
+# connection pool and one background event loop), so supervisor and worker
+# calls reuse TCP/TLS sessions instead of opening pools per handler.
+_SHARED_LOCK = threading.Lock()
+_SHARED_LOOP: asyncio.AbstractEventLoop | None = None
+_CLIENTS: dict[tuple[str, str], AsyncOpenAI] = {}
+
+
+def _get_shared_loop() -> asyncio.AbstractEventLoop:
+    global _SHARED_LOOP
+    with _SHARED_LOCK:
+        if _SHARED_LOOP is None:
+            _SHARED_LOOP = asyncio.new_event_loop()
+            thread = threading.Thread(target=_SHARED_LOOP.run_forever, daemon=True)
+            thread.start()
+        return _SHARED_LOOP
+
+
+def _get_client(base_url: str, api_key: str | None, max_concurrency: int = 32) -> AsyncOpenAI:
+    # The first handler to hit an endpoint sizes its pool; later handlers for
+    # the same endpoint reuse that client, so pass max_concurrency consistently.
+    key = (base_url, api_key or "")
+    with _SHARED_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = AsyncOpenAI(
+                base_url=base_url,
+                api_key=api_key,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=max_concurrency * 2,
+                        max_keepalive_connections=max_concurrency * 2,
+                    ),
+                    timeout=httpx.Timeout(120.0, connect=10.0),
+                    transport=httpx.AsyncHTTPTransport(retries=2),
+                ),
+            )
+            _CLIENTS[key] = client
+        return client
+
 
 @dataclass
 class Usage:
     input_tokens: int = 0
     output_tokens: int = 0
+    retries: int = 0
 
     def __iadd__(self, other: Usage) -> Usage:
         self.input_tokens += other.input_tokens
         self.output_tokens += other.output_tokens
+        self.retries += other.retries
         return self
 
 
+# Bound on the per-handler exact-match cache; every supervisor turn of every
+# example inserts, so an unbounded dict grows for the process lifetime.
+_CACHE_MAX_ENTRIES = 1024
+
+# Transient failures worth retrying; anything else propagates immediately.
+_RETRYABLE = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+_RETRY_ATTEMPTS = 6
+_RETRY_BASE_S = 0.5
+_RETRY_MAX_S = 30.0
+
+
+def _retry_after_s(exc: Exception) -> float | None:
+    """Provider-requested wait from a Retry-After header, if any."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
 @dataclass
 class LMResponse:
     text: str
     usage: Usage
     model: str
     elapsed: float
+    cached: bool = False
 
 
 class ModelHandler(ABC):
@@ -42,47 +117,290 @@ class ModelHandler(ABC):
 
 
 class OpenAIHandler(ModelHandler):
-    """Uses openai SDK with configurable base_url (Together AI, OpenAI, any compatible endpoint)."""
+    """Uses openai SDK with configurable base_url (Together AI, OpenAI, any compatible endpoint).
+
+    Providers with automatic prefix caching benefit from the orchestrator's
+    append-only message history (the prefix stays byte-stable across turns).
+    Set `use_prompt_cache=True` for Anthropic-style endpoints that need
+    explicit `cache_control` markers on the stable prefix.
+    """
 
     def __init__(
         self,
         model: str,
         base_url: str = "https://api.together.xyz/v1",
         api_key: str | None = None,
+        cache_enabled: bool = True,
+        use_prompt_cache: bool = False,
+        disk_cache: DiskCache | None = None,
+        semantic_cache: SemanticCache | None = None,
+        max_concurrency: int = 32,
         **kwargs,
     ):
+        self.use_prompt_cache = use_prompt_cache
+        self.disk_cache = disk_cache
+        self.semantic_cache = semantic_cache
         self.model = model
         self.default_kwargs = kwargs
-        self._client = AsyncOpenAI(
-            base_url=base_url,
-            api_key=api_key or os.environ.get("OPENAI_API_KEY") or os.environ.get("TOGETHER_API_KEY"),
+        self.cache_enabled = cache_enabled
+        self._cache: OrderedDict[bytes, LMResponse] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._client = _get_client(
+            base_url,
+            api_key or os.environ.get("OPENAI_API_KEY") or os.environ.get("TOGETHER_API_KEY"),
+            max_concurrency=max_concurrency,
         )
         self.total_usage = Usage()
+        self._usage_lock = threading.Lock()
+        # Long-lived event loop on a daemon thread, shared across handlers so
+        # every call reuses the pooled connections instead of paying
+        # asyncio.run's loop setup/teardown per request.
+        self._loop = _get_shared_loop()
+
+    def _run(self, coro):
+        """Run a coroutine on the persistent event loop and wait for the result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    @staticmethod
+    def _check_sync_call() -> None:
+        """Refuse blocking calls made from a running event loop; use achat instead."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        raise RuntimeError("chat()/chat_batch() called from an async context; await achat()/achat_batch() instead")
+
+    @staticmethod
+    def _mark_cacheable(messages: list[dict]) -> list[dict]:
+        """Add cache_control markers on the system message and the end of the
+        stable prefix (everything before the last two turns).
+
+        A marker caches the whole prefix up to and including it, and
+        Anthropic-style endpoints allow at most 4 breakpoints per request —
+        marking every prefix message fails once the history grows. Two
+        breakpoints cover both the shared system prompt and the per-run
+        history. Returns shallow copies; the caller's message dicts are never
+        mutated, which keeps the prefix byte-stable for providers with
+        automatic caching.
+        """
+        cutoff = max(len(messages) - 2, 0)
+        marks = set()
+        if messages and messages[0].get("role") == "system":
+            marks.add(0)
+        if cutoff:
+            marks.add(cutoff - 1)
+        return [
+            {**msg, "cache_control": {"type": "ephemeral"}} if i in marks else msg
+            for i, msg in enumerate(messages)
+        ]
 
-    async def _achat(self, messages: list[dict], **kwargs) -> LMResponse:
+    def _cache_key(self, messages: list[dict], merged: dict) -> bytes:
+        payload = repr((self.model, sorted(merged.items()), messages))
+        return hashlib.blake2b(payload.encode(), digest_size=16).digest()
+
+    async def achat(self, messages: list[dict], **kwargs) -> LMResponse:
+        """Async chat completion; preferred entry point inside async drivers."""
         merged = {**self.default_kwargs, **kwargs}
+
+        # Exact-match LRU cache: supervisors routinely re-issue identical
+        # worker prompts across chunks and iterations. Sampled (temperature
+        # > 0) responses are skipped for the same reason DiskCache refuses
+        # them: replay would collapse the sampling distribution.
+        key = None
+        if self.cache_enabled and not merged.get("temperature", 0):
+            key = self._cache_key(messages, merged)
+            with self._cache_lock:
+                hit = self._cache.get(key)
+                if hit is not None:
+                    self._cache.move_to_end(key)
+            if hit is not None:
+                return LMResponse(
+                    text=hit.text, usage=Usage(), model=hit.model, elapsed=0.0, cached=True
+                )
+
+        # Disk cache survives across processes; checked after the in-memory cache.
+        disk_key = None
+        if self.disk_cache is not None and self.disk_cache.should_cache(merged):
+            disk_key = DiskCache.make_key(self.model, messages, merged)
+            entry = self.disk_cache.get(disk_key)
+            if entry is not None:
+                return LMResponse(
+                    text=entry["text"], usage=Usage(), model=entry.get("model", self.model),
+                    elapsed=0.0, cached=True,
+                )
+
+        # Semantic cache catches near-duplicate prompts the exact caches miss.
+        sem_text = None
+        if self.semantic_cache is not None and messages:
+            sem_text = str(messages[-1].get("content", ""))
+            entry = self.semantic_cache.get(sem_text)
+            if entry is not None:
+                return LMResponse(
+                    text=entry["text"], usage=Usage(), model=entry.get("model", self.model),
+                    elapsed=0.0, cached=True,
+                )
+
+        send_messages = self._mark_cacheable(messages) if self.use_prompt_cache else messages
+
+        # Retry transient 429/connection/5xx failures with jittered exponential
+        # backoff so one rate-limit burst doesn't abort (and re-run) a whole
+        # example under high concurrency.
+        stream = merged.pop("stream", False)
+        for attempt in range(_RETRY_ATTEMPTS):
+            try:
+                if stream:
+                    text, usage, elapsed = await self._achat_stream(send_messages, merged)
+                else:
+                    t0 = time.perf_counter()
+                    resp = await self._client.chat.completions.create(
+                        model=self.model, messages=send_messages, **merged
+                    )
+                    elapsed = time.perf_counter() - t0
+                    text = resp.choices[0].message.content or ""
+                    usage = Usage(
+                        input_tokens=resp.usage.prompt_tokens if resp.usage else 0,
+                        output_tokens=resp.usage.completion_tokens if resp.usage else 0,
+                    )
+                break
+            except _RETRYABLE as e:
+                if attempt == _RETRY_ATTEMPTS - 1:
+                    raise
+                wait = min(_RETRY_BASE_S * 2 ** attempt, _RETRY_MAX_S) * (0.5 + random.random())
+                hinted = _retry_after_s(e)
+                if hinted is not None:
+                    wait = max(wait, hinted)
+                await asyncio.sleep(wait)
+        usage.retries = attempt
+        with self._usage_lock:
+            self.total_usage += usage
+        resp = LMResponse(text=text, usage=usage, model=self.model, elapsed=elapsed)
+        if key is not None:
+            with self._cache_lock:
+                self._cache[key] = resp
+                self._cache.move_to_end(key)
+                while len(self._cache) > _CACHE_MAX_ENTRIES:
+                    self._cache.popitem(last=False)
+        if disk_key is not None:
+            self.disk_cache.set(disk_key, {"text": resp.text, "model": resp.model})
+        if sem_text is not None:
+            self.semantic_cache.add(sem_text, {"text": resp.text, "model": resp.model})
+        return resp
+
+    async def _achat_stream(self, messages: list[dict], merged: dict) -> tuple[str, Usage, float]:
+        """Consume a streamed completion, overlapping network with accumulation."""
         t0 = time.perf_counter()
-        resp = await self._client.chat.completions.create(
-            model=self.model, messages=messages, **merged
+        stream = await self._client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **merged,
         )
-        elapsed = time.perf_counter() - t0
-        choice = resp.choices[0]
-        usage = Usage(
-            input_tokens=resp.usage.prompt_tokens if resp.usage else 0,
-            output_tokens=resp.usage.completion_tokens if resp.usage else 0,
+        parts: list[str] = []
+        usage = Usage()
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+            if chunk.usage:
+                usage = Usage(
+                    input_tokens=chunk.usage.prompt_tokens,
+                    output_tokens=chunk.usage.completion_tokens,
+                )
+        return "".join(parts), usage, time.perf_counter() - t0
+
+    async def achat_batch(self, message_batches: list[list[dict]], **kwargs) -> list[LMResponse]:
+        """Async batch chat completion over asyncio.gather.
+
+        Identical message lists within a batch are sent once; the in-memory
+        cache can't catch them because they'd all miss concurrently.
+        Duplicates get the shared text with zero usage, like cache hits.
+        """
+        merged = {**self.default_kwargs, **kwargs}
+        keys = [self._cache_key(msgs, merged) for msgs in message_batches]
+        unique: dict[bytes, list[dict]] = {}
+        for key, msgs in zip(keys, message_batches):
+            unique.setdefault(key, msgs)
+        responses = await asyncio.gather(
+            *(self.achat(msgs, **kwargs) for msgs in unique.values())
         )
-        self.total_usage += usage
-        return LMResponse(text=choice.message.content or "", usage=usage, model=self.model, elapsed=elapsed)
+        by_key = dict(zip(unique, responses))
+        seen: set[bytes] = set()
+        results = []
+        for key in keys:
+            resp = by_key[key]
+            if key in seen:
+                resp = LMResponse(
+                    text=resp.text, usage=Usage(), model=resp.model, elapsed=0.0, cached=True
+                )
+            else:
+                seen.add(key)
+            results.append(resp)
+        return results
 
     def chat(self, messages: list[dict], **kwargs) -> LMResponse:
-        return asyncio.run(self._achat(messages, **kwargs))
+        self._check_sync_call()
+        return self._run(self.achat(messages, **kwargs))
 
     def chat_batch(self, message_batches: list[list[dict]], **kwargs) -> list[LMResponse]:
-        async def _gather():
-            return await asyncio.gather(
-                *(self._achat(msgs, **kwargs) for msgs in message_batches)
-            )
-        return asyncio.run(_gather())
+        self._check_sync_call()
+        return self._run(self.achat_batch(message_batches, **kwargs))
+
+
+class _VLLMCoalescer:
+    """Buffers concurrent single chat() calls into one engine batch.
+
+    vLLM fuses prefill across requests within one ``llm.chat`` call; when many
+    threads each call ``chat`` singly, a short collection window recovers that
+    batching. Callers get their result back through a future.
+    """
+
+    def __init__(
+        self,
+        batch_fn,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 20.0,
+    ):
+        self._batch_fn = batch_fn
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000.0
+        self._lock = threading.Lock()
+        self._pending: list[tuple[list[dict], Future]] = []
+        self._timer: threading.Timer | None = None
+
+    def submit(self, messages: list[dict]) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            self._pending.append((messages, fut))
+            if len(self._pending) >= self._max_batch_size:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                batch, self._pending = self._pending, []
+            else:
+                if self._timer is None:
+                    self._timer = threading.Timer(self._max_wait, self._fire)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return fut
+        self._run_batch(batch)
+        return fut
+
+    def _fire(self) -> None:
+        with self._lock:
+            self._timer = None
+            batch, self._pending = self._pending, []
+        if batch:
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: list[tuple[list[dict], Future]]) -> None:
+        try:
+            results = self._batch_fn([m for m, _ in batch])
+        except Exception as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        for (_, fut), result in zip(batch, results):
+            fut.set_result(result)
 
 
 class VLLMHandler(ModelHandler):
@@ -92,6 +410,10 @@ class VLLMHandler(ModelHandler):
         model: Logical model name used in LMResponse and logs.
         model_path: Path or HF repo that vLLM loads weights from.
             Defaults to *model* when not provided.
+        use_coalescing: Collect concurrent ``chat`` calls for up to
+            ``coalesce_window_ms`` and run them as one engine batch.
+            Only calls without per-call sampling overrides coalesce.
+        coalesce_window_ms: Collection window when coalescing.
         **kwargs: Forwarded to ``SamplingParams`` as defaults
             (e.g. temperature, max_tokens).  Any additional keyword
             arguments whose names start with ``engine_`` are stripped
@@ -103,12 +425,18 @@ class VLLMHandler(ModelHandler):
         self,
         model: str,
         model_path: str | None = None,
+        use_coalescing: bool = False,
+        coalesce_window_ms: float = 20.0,
         **kwargs: Any,
     ):
         from vllm import LLM
 
         self.model = model
         self.model_path = model_path or model
+        self._coalescer = (
+            _VLLMCoalescer(self.chat_batch, max_wait_ms=coalesce_window_ms)
+            if use_coalescing else None
+        )
 
         # Split kwargs: engine_* go to LLM(), rest go to SamplingParams.
         engine_kwargs: dict[str, Any] = {}
@@ -130,6 +458,8 @@ class VLLMHandler(ModelHandler):
         return SamplingParams(**merged)
 
     def chat(self, messages: list[dict], **kwargs) -> LMResponse:
+        if self._coalescer is not None and not kwargs:
+            return self._coalescer.submit(messages).result()
         params = self._build_sampling_params(**kwargs)
         t0 = time.perf_counter()
         outputs = self._llm.chat(messages=messages, sampling_params=params)
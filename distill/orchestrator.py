@@ -2,19 +2,120 @@
 
 from __future__ import annotations
 
+import asyncio
+import io
 import re
+import threading
 import time
+from concurrent.futures import Future
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Callable
 
-from distill.log import RunLogger
+from distill.log import NullLogger, RunLogger
 from distill.models import LMResponse, ModelHandler, Usage
 from distill.prompts import build_system_prompt, build_user_prompt
-from distill.repl import REPL
+from distill.repl import ExecResult, REPL
 
 _CODE_BLOCK_RE = re.compile(r"```repl\s*\n(.*?)```", re.DOTALL)
 
 
+def _extract_code_blocks(text: str) -> list[str]:
+    """Pull ```repl``` blocks from a supervisor response.
+
+    Cheap literal check first — most turns have one block or none, so skip
+    the regex scan entirely when the marker is absent.
+    """
+    if "```repl" not in text:
+        return []
+    return [m.group(1) for m in _CODE_BLOCK_RE.finditer(text)]
+
+
+class _DynamicBatcher:
+    """Coalesces concurrent single-prompt worker calls into one batch request.
+
+    Supervisor code often loops over `worker(prompt)` instead of using
+    `worker_batch`; when such calls arrive from parallel blocks within a short
+    window, pack them into a single `chat_batch` round trip. Each caller gets
+    its result back through a future.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[list[str]], list[str]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+    ):
+        self._batch_fn = batch_fn
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000.0
+        self._lock = threading.Lock()
+        self._pending: list[tuple[str, Future]] = []
+        self._timer: threading.Timer | None = None
+
+    def submit(self, prompt: str) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            self._pending.append((prompt, fut))
+            if len(self._pending) >= self._max_batch_size:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                batch = self._take_pending()
+            else:
+                if self._timer is None:
+                    self._timer = threading.Timer(self._max_wait, self._fire)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return fut
+        self._run_batch(batch)
+        return fut
+
+    def _take_pending(self) -> list[tuple[str, Future]]:
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _fire(self) -> None:
+        with self._lock:
+            self._timer = None
+            batch = self._take_pending()
+        if batch:
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: list[tuple[str, Future]]) -> None:
+        prompts = [p for p, _ in batch]
+        try:
+            results = self._batch_fn(prompts)
+        except Exception as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        for (_, fut), result in zip(batch, results):
+            fut.set_result(result)
+
+
+def _execute_blocks(repl: REPL, code_blocks: list[str]) -> list[tuple[str, ExecResult]]:
+    """Run blocks in order, batching runs of `# parallel`-tagged blocks.
+
+    Blocks whose first line is `# parallel` are declared independent by the
+    supervisor; consecutive runs of them execute concurrently so their worker
+    network waits overlap. Everything else runs sequentially as before.
+    """
+    pairs = []
+    i = 0
+    while i < len(code_blocks):
+        code = code_blocks[i]
+        if code.lstrip().startswith("# parallel"):
+            group = [code]
+            while i + 1 < len(code_blocks) and code_blocks[i + 1].lstrip().startswith("# parallel"):
+                i += 1
+                group.append(code_blocks[i])
+            pairs.extend(zip(group, repl.execute_parallel(group)))
+        else:
+            pairs.append((code, repl.execute(code)))
+        i += 1
+    return pairs
+
+
 @dataclass
 class RunResult:
     answer: Any
@@ -35,6 +136,7 @@ def run(
     output_limit: int = 2000,
     worker_ctx_k: int = 8,
     label: str | None = None,
+    exec_timeout_s: float | None = 30.0,
 ) -> RunResult:
     """Run a supervisor-worker deep research session.
 
@@ -48,47 +150,62 @@ def run(
         output_limit: Max chars of REPL output included in LM context.
         worker_ctx_k: Worker context window size in thousands of tokens (for prompt hints).
         label: Optional label for the task (e.g. ground truth, dataset name).
+        exec_timeout_s: Wall-clock budget per REPL code block, excluding time
+            blocked in worker calls. None disables the timeout.
     """
-    logger = RunLogger(log_dir) if log_dir else None
-    if logger:
-        logger.log_task_input(query, context, label)
+    logger = RunLogger(log_dir) if log_dir else NullLogger()
+    # Stringify structured contexts once up front; everything downstream
+    # (logging, prompts) shares the one string.
+    context_str = context if isinstance(context, str) else str(context)
+    logger.log_task_input(query, context_str, label)
     t0 = time.perf_counter()
     step = 0
 
-    # Track worker usage separately since worker calls happen inside REPL
+    # Track worker usage separately since worker calls happen inside REPL.
+    # Batches may complete on batcher/parallel-block threads, so guard the
+    # accumulator and add once per batch rather than once per response.
     worker_usage = Usage()
-
-    def _worker_fn(prompt: str) -> str:
-        nonlocal worker_usage
-        msgs = [{"role": "user", "content": prompt}]
-        resp = worker.chat(msgs)
-        worker_usage += resp.usage
-        if logger:
-            logger.log_worker(step, prompt, resp)
-        return resp.text
+    usage_lock = threading.Lock()
 
     def _worker_batch_fn(prompts: list[str]) -> list[str]:
-        nonlocal worker_usage
         batches = [[{"role": "user", "content": p}] for p in prompts]
         responses = worker.chat_batch(batches)
-        for prompt, resp in zip(prompts, responses):
-            worker_usage += resp.usage
-            if logger:
-                logger.log_worker(step, prompt, resp)
+        batch_in = sum(r.usage.input_tokens for r in responses)
+        batch_out = sum(r.usage.output_tokens for r in responses)
+        with usage_lock:
+            worker_usage.input_tokens += batch_in
+            worker_usage.output_tokens += batch_out
+        logger.log_worker_batch(step, prompts, responses)
         return [r.text for r in responses]
 
-    repl = REPL(context, query, _worker_fn, _worker_batch_fn, output_limit=output_limit)
-    messages = build_system_prompt(context, query, worker_ctx_k=worker_ctx_k, output_limit=output_limit)
+    # Single worker() calls funnel through a short-window batcher so that
+    # concurrent calls (e.g. from parallel blocks) coalesce into one request.
+    batcher = _DynamicBatcher(_worker_batch_fn)
+
+    def _worker_fn(prompt: str) -> str:
+        return batcher.submit(prompt).result()
+
+    repl = REPL(
+        context, query, _worker_fn, _worker_batch_fn,
+        output_limit=output_limit, timeout_s=exec_timeout_s,
+    )
+    # Invariant: `messages` is append-only and earlier entries are never
+    # mutated, so the prefix stays byte-identical across supervisor turns and
+    # provider-side prompt caching can reuse its KV state.
+    messages = build_system_prompt(
+        context, query,
+        worker_ctx_k=worker_ctx_k, output_limit=output_limit,
+        ctx_len=len(context_str),
+    )
 
     try:
         for step in range(max_iterations):
             # Call supervisor
             sup_resp = supervisor.chat(messages)
-            if logger:
-                logger.log_supervisor(step, messages, sup_resp)
+            logger.log_supervisor(step, messages, sup_resp)
 
             # Extract code blocks
-            code_blocks = _CODE_BLOCK_RE.findall(sup_resp.text)
+            code_blocks = _extract_code_blocks(sup_resp.text)
 
             if not code_blocks:
                 # No code blocks — supervisor responded with text only.
@@ -97,19 +214,20 @@ def run(
                 messages.append({"role": "user", "content": "Please write a ```repl``` code block to proceed."})
                 continue
 
-            # Execute each code block
-            all_output_parts = []
-            for code in code_blocks:
-                result = repl.execute(code)
-                if logger:
-                    logger.log_repl(step, code, result)
+            # Execute code blocks; consecutive `# parallel`-tagged blocks run concurrently.
+            # Accumulate the summary in one buffer instead of concatenating strings.
+            summary_buf = io.StringIO()
+            for code, result in _execute_blocks(repl, code_blocks):
+                logger.log_repl(step, code, result)
 
-                truncated = repl.truncate_output(result)
-                all_output_parts.append(f"Code:\n```python\n{code}```\nOutput:\n{truncated}")
+                summary_buf.write("Code:\n```python\n")
+                summary_buf.write(code)
+                summary_buf.write("```\nOutput:\n")
+                summary_buf.write(repl.truncate_output(result))
+                summary_buf.write("\n\n")
 
                 if repl.final_answer is not None:
-                    if logger:
-                        logger.log_task_output(repl.final_answer)
+                    logger.log_task_output(repl.final_answer)
                     return RunResult(
                         answer=repl.final_answer,
                         iterations=step + 1,
@@ -120,9 +238,11 @@ def run(
 
             # Append code + output to message history
             messages.append({"role": "assistant", "content": sup_resp.text})
-            execution_summary = "\n\n".join(all_output_parts)
-            nudge = build_user_prompt(step, max_iterations)
-            messages.append({"role": "user", "content": f"{execution_summary}\n\n{nudge}"})
+            summary_buf.write(build_user_prompt(step, max_iterations))
+            messages.append({"role": "user", "content": summary_buf.getvalue()})
+
+            # Push buffered log events to disk once per iteration.
+            logger.flush()
 
         # Max iterations reached — force final answer
         messages.append({
@@ -130,21 +250,18 @@ def run(
             "content": "Maximum iterations reached. Call FINAL(answer) with your best answer now.",
         })
         final_resp = supervisor.chat(messages)
-        if logger:
-            logger.log_supervisor(step + 1, messages, final_resp)
+        logger.log_supervisor(step + 1, messages, final_resp)
 
         # Try to execute any final code
-        code_blocks = _CODE_BLOCK_RE.findall(final_resp.text)
+        code_blocks = _extract_code_blocks(final_resp.text)
         for code in code_blocks:
             result = repl.execute(code)
-            if logger:
-                logger.log_repl(step + 1, code, result)
+            logger.log_repl(step + 1, code, result)
             if repl.final_answer is not None:
                 break
 
         answer = repl.final_answer or final_resp.text
-        if logger:
-            logger.log_task_output(answer)
+        logger.log_task_output(answer)
         return RunResult(
             answer=answer,
             iterations=step + 1,
@@ -153,5 +270,15 @@ def run(
             elapsed=time.perf_counter() - t0,
         )
     finally:
-        if logger:
-            logger.close()
+        logger.close()
+
+
+async def arun(*args, **kwargs) -> RunResult:
+    """Async wrapper around `run()` for concurrent drivers.
+
+    The orchestrator loop itself is synchronous (REPL `exec` cannot await),
+    but all network I/O already multiplexes on the handlers' shared event
+    loop, so running each session on a worker thread lets many examples
+    overlap their supervisor/worker round trips.
+    """
+    return await asyncio.to_thread(run, *args, **kwargs)
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import functools
 from typing import Any
 
 SYSTEM_PROMPT = """\
@@ -15,7 +16,9 @@ The worker has a ~{worker_ctx}k context window, so keep prompts under {worker_ch
 - `worker_batch(prompts: list[str]) -> list[str]` — call the worker on multiple prompts in parallel.
 - `FINAL(answer)` — call this with your final answer to end the task.
 
-Wrap your code in ```repl``` blocks. Your namespace persists between blocks.
+Wrap your code in ```repl``` blocks. Your namespace persists between blocks. If you write \
+several independent blocks in one response, start each with a `# parallel` comment and they \
+will execute concurrently.
 
 Strategy:
 1. Inspect `context` (length, structure) with a short code block.
@@ -27,21 +30,47 @@ Keep print output concise — only the first {output_limit} chars of stdout/stde
 """
 
 
+@functools.lru_cache(maxsize=16)
+def _render_system(worker_ctx_k: int, output_limit: int) -> str:
+    """Format the system prompt once per (worker_ctx_k, output_limit) pair."""
+    return SYSTEM_PROMPT.format(
+        worker_ctx=worker_ctx_k,
+        worker_chunk=worker_ctx_k * 1024,  # rough char estimate
+        output_limit=output_limit,
+    )
+
+
+def _context_len(context: Any) -> int:
+    """Approximate context size without stringifying non-str containers.
+
+    For str this is exact; for a list/tuple of strings it sums the elements
+    without building the joined string; anything else is measured as
+    `len(str(context))`, matching what the REPL exposes. The number is a hint
+    for the supervisor prompt, not an exact char count.
+    """
+    if isinstance(context, str):
+        return len(context)
+    if isinstance(context, (list, tuple)) and all(isinstance(x, str) for x in context):
+        return sum(map(len, context))
+    return len(str(context))
+
+
 def build_system_prompt(
     context: Any,
     query: str,
     *,
     worker_ctx_k: int = 8,
     output_limit: int = 2000,
+    ctx_len: int | None = None,
 ) -> list[dict]:
-    """Build the initial message list with system prompt and context metadata."""
-    worker_chunk = worker_ctx_k * 1024  # rough char estimate
-    ctx_len = len(context) if isinstance(context, str) else len(str(context))
-    system_text = SYSTEM_PROMPT.format(
-        worker_ctx=worker_ctx_k,
-        worker_chunk=worker_chunk,
-        output_limit=output_limit,
-    )
+    """Build the initial message list with system prompt and context metadata.
+
+    Callers running many queries over the same document can pass a
+    precomputed `ctx_len` to skip re-measuring the context per run.
+    """
+    if ctx_len is None:
+        ctx_len = _context_len(context)
+    system_text = _render_system(worker_ctx_k, output_limit)
     return [
         {"role": "system", "content": system_text},
         {"role": "user", "content": f"Context length: {ctx_len:,} characters.\n\nQuestion: {query}"},
@@ -2,8 +2,11 @@
 
 from __future__ import annotations
 
+import collections
+import functools
 import io
 import sys
+import threading
 import time
 import traceback
 from dataclasses import dataclass
@@ -21,8 +24,113 @@ class FinalSignal(Exception):
 class ExecResult:
     stdout: str
     stderr: str
-    variables: dict[str, Any]
     elapsed: float
+    truncated: bool = False
+    timed_out: bool = False
+
+
+class _BoundedStringIO(io.TextIOBase):
+    """Write-capped text buffer keeping the first and last `cap` chars.
+
+    Keeps a rogue `print(context)` from materializing the whole document in
+    memory, while still preserving the tail — often where the useful part of
+    a long dump (a final count, an error) lands.
+    """
+
+    def __init__(self, cap: int):
+        self._cap = cap
+        self._parts: list[str] = []
+        self._size = 0
+        self._tail: collections.deque[str] = collections.deque()
+        self._tail_size = 0
+        self.truncated = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        n = len(s)
+        remaining = self._cap - self._size
+        if remaining > 0:
+            if n <= remaining:
+                self._parts.append(s)
+                self._size += n
+                return n
+            self._parts.append(s[:remaining])
+            self._size = self._cap
+            s = s[remaining:]
+        self.truncated = True
+        if len(s) >= self._cap:
+            self._tail.clear()
+            self._tail.append(s[-self._cap:])
+            self._tail_size = self._cap
+            return n
+        self._tail.append(s)
+        self._tail_size += len(s)
+        while self._tail_size > self._cap:
+            first = self._tail[0]
+            excess = self._tail_size - self._cap
+            if len(first) <= excess:
+                self._tail.popleft()
+                self._tail_size -= len(first)
+            else:
+                self._tail[0] = first[excess:]
+                self._tail_size -= excess
+        return n
+
+    def getvalue(self) -> str:
+        head = "".join(self._parts)
+        if not self._tail:
+            return head
+        return f"{head}\n...[output truncated]...\n" + "".join(self._tail)
+
+
+class _ThreadLocalStream(io.TextIOBase):
+    """Routes writes to a per-thread buffer, falling back to the original stream.
+
+    Lets several code blocks run concurrently while each captures its own
+    stdout/stderr (a plain `sys.stdout` swap is process-global).
+    """
+
+    def __init__(self, fallback):
+        self._fallback = fallback
+        self._local = threading.local()
+
+    def set_buffer(self, buf) -> None:
+        """Route this thread's writes to `buf`; None restores the fallback."""
+        self._local.buf = buf
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        buf = getattr(self._local, "buf", None)
+        return (buf if buf is not None else self._fallback).write(s)
+
+    def flush(self) -> None:
+        buf = getattr(self._local, "buf", None)
+        (buf if buf is not None else self._fallback).flush()
+
+
+# One proxy pair is installed over sys.stdout/sys.stderr lazily and never
+# removed. Per-call swap/restore races concurrent REPL sessions: one session
+# restoring while another is mid-exec sends the live block's prints to the
+# real console and leaves a stale proxy installed. The per-thread routing
+# above makes a permanent install safe — threads without a registered buffer
+# fall through to the original streams.
+_STREAM_LOCK = threading.Lock()
+_STDOUT_PROXY: _ThreadLocalStream | None = None
+_STDERR_PROXY: _ThreadLocalStream | None = None
+
+
+def _install_proxies() -> tuple[_ThreadLocalStream, _ThreadLocalStream]:
+    global _STDOUT_PROXY, _STDERR_PROXY
+    with _STREAM_LOCK:
+        if _STDOUT_PROXY is None:
+            _STDOUT_PROXY = _ThreadLocalStream(sys.stdout)
+            _STDERR_PROXY = _ThreadLocalStream(sys.stderr)
+            sys.stdout, sys.stderr = _STDOUT_PROXY, _STDERR_PROXY
+        return _STDOUT_PROXY, _STDERR_PROXY
 
 
 _BLOCKED_BUILTINS = {"eval", "exec", "compile", "input"}
@@ -34,6 +142,18 @@ def _make_safe_builtins() -> dict:
     return safe
 
 
+# Built once at import; each REPL takes a shallow copy. A read-only proxy
+# would be cheaper still, but IMPORT_NAME requires __builtins__ to be a real
+# dict — a proxy breaks every `import` in supervisor code.
+_SAFE_BUILTINS = _make_safe_builtins()
+
+
+@functools.lru_cache(maxsize=256)
+def _compile(code: str):
+    """Compile a code block once; supervisors often re-run identical blocks."""
+    return compile(code, "<repl>", "exec")
+
+
 class REPL:
     """Sandboxed Python REPL with worker model primitives.
 
@@ -52,17 +172,66 @@ class REPL:
         worker_fn: Callable[[str], str],
         worker_batch_fn: Callable[[list[str]], list[str]],
         output_limit: int = 2000,
+        timeout_s: float | None = 30.0,
     ):
         self.output_limit = output_limit
+        self.timeout_s = timeout_s
+        # Time blocked inside worker primitives doesn't count against the
+        # exec budget — worker latency (retries, rate limits) is outside the
+        # supervisor code's control.
+        self._blocked_lock = threading.Lock()
+        self._blocked_s = 0.0
+        self._in_worker = 0
         self._namespace: dict[str, Any] = {
-            "__builtins__": _make_safe_builtins(),
+            "__builtins__": dict(_SAFE_BUILTINS),
             "context": context,
             "query": query,
-            "worker": worker_fn,
-            "worker_batch": worker_batch_fn,
+            "worker": self._track_blocking(worker_fn),
+            "worker_batch": self._track_blocking(worker_batch_fn),
             "FINAL": self._final,
         }
         self._final_answer: Any = None
+        self._last_exc: tuple | None = None
+
+    def _track_blocking(self, fn: Callable) -> Callable:
+        """Wrap a worker primitive so time spent inside it pauses the exec clock."""
+        def wrapped(*args, **kwargs):
+            t0 = time.monotonic()
+            with self._blocked_lock:
+                self._in_worker += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._blocked_lock:
+                    self._in_worker -= 1
+                    self._blocked_s += time.monotonic() - t0
+        return wrapped
+
+    def _join_with_budget(self, threads: list[threading.Thread]) -> None:
+        """Join block threads against `timeout_s` of non-worker wall time.
+
+        The deadline slides forward by however long blocks have been blocked
+        in worker primitives, and never fires while a worker call is still in
+        flight — a rate-limited batch must not get its block falsely
+        abandoned. Blocked time is pooled across threads, which is generous
+        to a hot loop running beside slow worker calls; the guarantee kept is
+        "no false abandonment", not a tight bound.
+        """
+        with self._blocked_lock:
+            blocked0 = self._blocked_s
+        t_start = time.monotonic()
+        while True:
+            alive = [t for t in threads if t.is_alive()]
+            if not alive:
+                return
+            with self._blocked_lock:
+                blocked = self._blocked_s - blocked0
+                in_worker = self._in_worker
+            remaining = t_start + self.timeout_s + blocked - time.monotonic()
+            if remaining <= 0 and not in_worker:
+                return
+            # Poll so in-flight worker time keeps extending the deadline.
+            alive[0].join(0.1 if remaining <= 0 else min(remaining, 0.1))
 
     def _final(self, answer: Any) -> None:
         raise FinalSignal(answer)
@@ -71,31 +240,159 @@ class REPL:
     def final_answer(self) -> Any:
         return self._final_answer
 
-    def execute(self, code: str) -> ExecResult:
-        """Execute code in the sandboxed namespace. Returns ExecResult with full output."""
-        stdout_buf = io.StringIO()
-        stderr_buf = io.StringIO()
-        old_stdout, old_stderr = sys.stdout, sys.stderr
-        sys.stdout, sys.stderr = stdout_buf, stderr_buf
-
+    def _exec_into(
+        self, code: str, namespace: dict, stdout_buf: _BoundedStringIO, stderr_buf: _BoundedStringIO
+    ) -> float:
+        """Run a code block against `namespace`, capturing exceptions."""
         t0 = time.perf_counter()
         try:
-            exec(code, self._namespace)
+            exec(_compile(code), namespace)
         except FinalSignal as fs:
             self._final_answer = fs.answer
-        except Exception:
-            stderr_buf.write(traceback.format_exc())
-        finally:
-            sys.stdout, sys.stderr = old_stdout, old_stderr
-            elapsed = time.perf_counter() - t0
+        except Exception as e:
+            # Type + message is all the supervisor needs; full frame walks
+            # are deferred to full_traceback().
+            self._last_exc = sys.exc_info()
+            stderr_buf.write(f"{type(e).__name__}: {e}")
+        return time.perf_counter() - t0
+
+    def execute(self, code: str) -> ExecResult:
+        """Execute code in the sandboxed namespace. Returns ExecResult with full output.
+
+        When `timeout_s` is set, the block runs on a worker thread against a
+        namespace copy and is abandoned (result flagged `timed_out`, copy
+        discarded) if it exceeds the wall-clock budget — a `while True` loop
+        can no longer hang the whole run, and an abandoned block's late
+        assignments never land in the live namespace. Time blocked inside
+        worker()/worker_batch() doesn't count against the budget. The
+        abandoned thread is not killed; its buffers stay registered with the
+        stream proxies, so any later writes land in the discarded buffers
+        rather than the console.
+        """
+        # Headroom above output_limit so both streams survive truncation intact.
+        cap = self.output_limit * 2
+        stdout_buf = _BoundedStringIO(cap)
+        stderr_buf = _BoundedStringIO(cap)
+        out_proxy, err_proxy = _install_proxies()
+
+        if self.timeout_s is None:
+            out_proxy.set_buffer(stdout_buf)
+            err_proxy.set_buffer(stderr_buf)
+            try:
+                elapsed = self._exec_into(code, self._namespace, stdout_buf, stderr_buf)
+            finally:
+                out_proxy.set_buffer(None)
+                err_proxy.set_buffer(None)
+            timed_out = False
+        else:
+            holder: dict[str, float] = {}
+            ns = dict(self._namespace)
+
+            def _target():
+                out_proxy.set_buffer(stdout_buf)
+                err_proxy.set_buffer(stderr_buf)
+                holder["elapsed"] = self._exec_into(code, ns, stdout_buf, stderr_buf)
+
+            thread = threading.Thread(target=_target, daemon=True)
+            thread.start()
+            self._join_with_budget([thread])
+            timed_out = thread.is_alive()
+            if timed_out:
+                stderr_buf.write(f"[timeout] code block exceeded {self.timeout_s:g}s and was abandoned")
+                elapsed = self.timeout_s
+            else:
+                # Same objects for unchanged keys, so update() is a no-op
+                # there; abandoned copies above are simply dropped.
+                self._namespace.update(ns)
+                elapsed = holder.get("elapsed", 0.0)
 
         return ExecResult(
             stdout=stdout_buf.getvalue(),
             stderr=stderr_buf.getvalue(),
-            variables={k: v for k, v in self._namespace.items() if not k.startswith("_")},
             elapsed=elapsed,
+            truncated=stdout_buf.truncated or stderr_buf.truncated,
+            timed_out=timed_out,
         )
 
+    def execute_parallel(self, codes: list[str]) -> list[ExecResult]:
+        """Execute independent code blocks concurrently, one thread each.
+
+        Each block runs against a shallow copy of the namespace; new and
+        changed bindings are merged back afterwards (last writer wins on
+        conflicts). Intended for blocks the supervisor marked `# parallel`,
+        where the win is overlapping worker network waits.
+
+        The blocks share one `timeout_s` budget of non-worker wall time,
+        matching `execute`: stragglers are abandoned (flagged `timed_out`)
+        and their namespace changes are discarded.
+        """
+        if len(codes) == 1:
+            return [self.execute(codes[0])]
+
+        cap = self.output_limit * 2
+        base = dict(self._namespace)
+        namespaces = [dict(base) for _ in codes]
+        bufs = [(_BoundedStringIO(cap), _BoundedStringIO(cap)) for _ in codes]
+        elapsed: dict[int, float] = {}
+
+        out_proxy, err_proxy = _install_proxies()
+
+        def _run_one(i: int) -> None:
+            stdout_buf, stderr_buf = bufs[i]
+            out_proxy.set_buffer(stdout_buf)
+            err_proxy.set_buffer(stderr_buf)
+            t0 = time.perf_counter()
+            try:
+                exec(_compile(codes[i]), namespaces[i])
+            except FinalSignal as fs:
+                self._final_answer = fs.answer
+            except Exception as e:
+                self._last_exc = sys.exc_info()
+                stderr_buf.write(f"{type(e).__name__}: {e}")
+            elapsed[i] = time.perf_counter() - t0
+
+        threads = [
+            threading.Thread(target=_run_one, args=(i,), daemon=True)
+            for i in range(len(codes))
+        ]
+        for t in threads:
+            t.start()
+        if self.timeout_s is None:
+            for t in threads:
+                t.join()
+        else:
+            self._join_with_budget(threads)
+
+        results = []
+        for i, t in enumerate(threads):
+            stdout_buf, stderr_buf = bufs[i]
+            timed_out = t.is_alive()
+            if timed_out:
+                stderr_buf.write(f"[timeout] code block exceeded {self.timeout_s:g}s and was abandoned")
+            results.append(ExecResult(
+                stdout=stdout_buf.getvalue(),
+                stderr=stderr_buf.getvalue(),
+                elapsed=self.timeout_s if timed_out else elapsed.get(i, 0.0),
+                truncated=stdout_buf.truncated or stderr_buf.truncated,
+                timed_out=timed_out,
+            ))
+
+        # Merge namespace changes back, in block order; abandoned blocks are
+        # skipped since their namespaces may still be mutating.
+        for i, ns in enumerate(namespaces):
+            if results[i].timed_out:
+                continue
+            for k, v in ns.items():
+                if k not in base or base[k] is not v:
+                    self._namespace[k] = v
+        return results
+
+    def full_traceback(self) -> str:
+        """Format the most recent exception's full traceback on demand."""
+        if self._last_exc is None:
+            return ""
+        return "".join(traceback.format_exception(*self._last_exc))
+
     def truncate_output(self, result: ExecResult) -> str:
         """Return combined stdout+stderr truncated to output_limit for LM context."""
         parts = []
@@ -1,19 +1,17 @@
 """Run a supervisor-worker experiment on a benchmark dataset."""
 
 import argparse
+import asyncio
+import csv
 import os
 import sys
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-import pandas as pd
-from dotenv import load_dotenv
-
-load_dotenv()
-
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from distill import OpenAIHandler, run
+from distill import DiskCache, OpenAIHandler, arun
 
 
 def main():
@@ -33,6 +31,15 @@ def main():
     p.add_argument("--base-url",
                    default=os.environ.get("BASE_URL", "https://api.together.xyz/v1"))
     p.add_argument("--max-iterations", type=int, default=15)
+    p.add_argument("--concurrency", type=int, default=16,
+                   help="Max examples in flight at once (default: 16)")
+    p.add_argument("--cache", action=argparse.BooleanOptionalAction, default=False,
+                   help="Cache model responses on disk across runs")
+    p.add_argument("--cache-nondeterministic", action="store_true",
+                   help="Cache sampled (temperature > 0) responses too")
+    p.add_argument("--semantic-cache-threshold", type=float, default=None,
+                   help="Enable the semantic worker cache at this cosine-sim threshold "
+                        "(requires sentence-transformers + faiss)")
     args = p.parse_args()
 
     # --- Load task ---
@@ -53,8 +60,9 @@ def main():
         print(f"Unknown task: {args.task}", file=sys.stderr)
         sys.exit(1)
 
-    examples = task.build_dataset()
-    print(f"Task: {args.task} | Examples: {len(examples)} | Seed: {args.seed}")
+    # Dataset load (download + JSON parse) is the slowest startup step; run it
+    # on a thread while the directories and handlers are set up below.
+    dataset_future = ThreadPoolExecutor(max_workers=1).submit(task.build_dataset)
     print(f"Supervisor: {args.supervisor_model}")
     print(f"Worker: {args.worker_model}")
     print(f"Judge: {args.judge_model}")
@@ -65,42 +73,66 @@ def main():
     os.makedirs(experiment_dir, exist_ok=True)
 
     # --- Setup models ---
+    disk_cache = DiskCache(cache_nondeterministic=args.cache_nondeterministic) if args.cache else None
+    semantic_cache = None
+    if args.semantic_cache_threshold is not None:
+        from distill import SemanticCache
+        semantic_cache = SemanticCache(threshold=args.semantic_cache_threshold)
     supervisor = OpenAIHandler(
         model=args.supervisor_model, base_url=args.base_url,
-        temperature=0.7, max_tokens=2048,
+        temperature=0.7, max_tokens=2048, disk_cache=disk_cache,
+        max_concurrency=args.concurrency,
     )
     worker = OpenAIHandler(
         model=args.worker_model, base_url=args.base_url,
-        temperature=0.6, max_tokens=512,
+        temperature=0.6, max_tokens=512, disk_cache=disk_cache,
+        semantic_cache=semantic_cache,
+        max_concurrency=args.concurrency,
     )
 
-    # --- Run ---
-    rows = []
-    for i, example in enumerate(examples):
-        print(f"\n[{i+1}/{len(examples)}] {example.query[:80]}...")
-        example_dir = os.path.join(experiment_dir, f"{i:03d}")
+    examples = dataset_future.result()
+    print(f"Task: {args.task} | Examples: {len(examples)} | Seed: {args.seed}")
 
-        try:
-            result = run(
-                query=example.query,
-                context=example.context,
-                supervisor=supervisor,
-                worker=worker,
-                max_iterations=args.max_iterations,
-                log_dir=example_dir,
-                label=example.target,
-            )
-            prediction = str(result.answer)
-            sc = task.score(prediction, example)
-            print(f"  Score: {sc} | Iters: {result.iterations} | {result.elapsed:.1f}s")
-
-        except Exception as e:
-            print(f"  ERROR: {e}")
-            traceback.print_exc()
-            prediction = f"ERROR: {e}"
-            sc = 0
-
-        rows.append({
+    # --- Run (examples in flight concurrently, bounded by --concurrency) ---
+    # Rows stream to disk as examples finish (in completion order), so a crash
+    # mid-run keeps everything scored so far and no row stays in memory.
+    csv_path = os.path.join(experiment_dir, "results.csv")
+    csv_f = open(csv_path, "w", newline="")
+    writer = csv.DictWriter(
+        csv_f,
+        fieldnames=["id", "doc_id", "question", "log_path", "label", "prediction", "score"],
+    )
+    writer.writeheader()
+    score_sum = 0.0
+    done = 0
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def process(i, example):
+        nonlocal score_sum, done
+        example_dir = os.path.join(experiment_dir, f"{i:03d}")
+        async with sem:
+            print(f"[{i+1}/{len(examples)}] {example.query[:80]}...")
+            try:
+                result = await arun(
+                    query=example.query,
+                    context=example.context,
+                    supervisor=supervisor,
+                    worker=worker,
+                    max_iterations=args.max_iterations,
+                    log_dir=example_dir,
+                    label=example.target,
+                )
+                prediction = str(result.answer)
+                sc = await asyncio.to_thread(task.score, prediction, example)
+                print(f"[{i+1}/{len(examples)}] Score: {sc} | Iters: {result.iterations} | {result.elapsed:.1f}s")
+
+            except Exception as e:
+                print(f"[{i+1}/{len(examples)}] ERROR: {e}")
+                traceback.print_exc()
+                prediction = f"ERROR: {e}"
+                sc = 0
+
+        writer.writerow({
             "id": example.id,
             "doc_id": example.metadata.get("doc_id", ""),
             "question": example.query,
@@ -109,16 +141,32 @@ def main():
             "prediction": prediction,
             "score": sc,
         })
+        csv_f.flush()
+        score_sum += sc
+        done += 1
+
+    async def run_all():
+        # asyncio.to_thread (run sessions, judge scoring) uses the default
+        # executor; size it to the concurrency cap so sessions never queue
+        # behind each other for threads.
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=args.concurrency)
+        )
+        await asyncio.gather(*(process(i, e) for i, e in enumerate(examples)))
 
-    # --- Save results ---
-    df = pd.DataFrame(rows)
-    csv_path = os.path.join(experiment_dir, "results.csv")
-    df.to_csv(csv_path, index=False)
+    try:
+        asyncio.run(run_all())
+    finally:
+        csv_f.close()
 
     print(f"\n{'='*60}")
     print(f"Results saved to: {csv_path}")
-    print(f"Accuracy: {df['score'].mean():.2%} ({int(df['score'].sum())}/{len(df)})")
+    # `done` can be 0 (empty split or over-aggressive --limit); don't crash.
+    print(f"Accuracy: {score_sum / (done or 1):.2%} ({int(score_sum)}/{done})")
 
 
 if __name__ == "__main__":
+    # Only actual runs need .env credentials; imports stay cheap otherwise.
+    from dotenv import load_dotenv
+    load_dotenv()
     main()
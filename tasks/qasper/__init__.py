@@ -6,12 +6,20 @@ import json
 import os
 import random
 import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 
-from openai import OpenAI
-
 from tasks.qasper.dataset import load_qasper_dataset
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Fallback matcher for judge responses that aren't clean JSON.
+_IS_CORRECT_RE = re.compile(r'"is_correct"\s*:\s*(true|false)', re.IGNORECASE)
+
 
 @dataclass
 class QasperExample:
@@ -23,19 +31,22 @@ class QasperExample:
     metadata: dict = field(default_factory=dict)
 
 
-JUDGE_PROMPT = """\
+# Static judge instructions go in the system message so providers with prefix
+# caching reuse KV state across examples; only the user message varies.
+JUDGE_SYSTEM_PROMPT = """\
 You are an expert evaluator. Determine if a predicted answer matches the correct answer.
 
-Question: {query}
+Answers may be phrased differently but convey the same information.
 
-Predicted Answer: {pred}
+Respond with ONLY a JSON object:
+{"explanation": "brief explanation", "is_correct": true or false}"""
 
-Correct Answer: {target}
+JUDGE_USER_PROMPT = """\
+Question: {query}
 
-Is the predicted answer correct? Answers may be phrased differently but convey the same information.
+Predicted Answer: {pred}
 
-Respond with ONLY a JSON object:
-{{"explanation": "brief explanation", "is_correct": true or false}}"""
+Correct Answer: {target}"""
 
 
 class QasperTask:
@@ -56,8 +67,11 @@ class QasperTask:
         self._api_key = api_key
         self._client = None
 
-    def _get_client(self) -> OpenAI:
+    def _get_client(self):
         if self._client is None:
+            # Imported here so dataset-only workflows skip the openai/httpx chain.
+            from openai import OpenAI
+
             self._client = OpenAI(
                 base_url=self._base_url,
                 api_key=self._api_key or os.environ.get("TOGETHER_API_KEY") or os.environ.get("OPENAI_API_KEY"),
@@ -92,23 +106,31 @@ class QasperTask:
 
     def score(self, pred: str, example: QasperExample) -> int:
         """Score prediction against ground truth using LLM judge. Returns 0 or 1."""
-        prompt = JUDGE_PROMPT.format(
+        prompt = JUDGE_USER_PROMPT.format(
             query=example.query,
             pred=pred,
             target=example.target,
         )
         resp = self._get_client().chat.completions.create(
             model=self.judge_model,
-            messages=[{"role": "user", "content": prompt}],
+            messages=[
+                {"role": "system", "content": JUDGE_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
             temperature=0.0,
             max_tokens=256,
         )
         text = resp.choices[0].message.content
         try:
-            result = json.loads(text)
+            result = _loads(text)
             return 1 if result.get("is_correct", False) else 0
-        except json.JSONDecodeError:
-            match = re.search(r'"is_correct"\s*:\s*(true|false)', text, re.IGNORECASE)
+        except ValueError:
+            match = _IS_CORRECT_RE.search(text)
             if match:
                 return 1 if match.group(1).lower() == "true" else 0
             return 0
+
+    def score_batch(self, preds: list[str], examples: list[QasperExample]) -> list[int]:
+        """Score many predictions concurrently; judge calls are RTT-bound."""
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            return list(pool.map(self.score, preds, examples))
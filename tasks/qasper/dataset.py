@@ -2,12 +2,23 @@
 
 import json
 import os
+import pickle
 import tarfile
 import urllib.request
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 _CACHE_DIR = Path.home() / ".cache" / "qasper"
 
+# Bump when the flattening logic changes so stale caches are ignored.
+_FLAT_VERSION = 2
+
 _URL_TRAIN_DEV = "https://qasper-dataset.s3.us-west-2.amazonaws.com/qasper-train-dev-v0.3.tgz"
 _URL_TEST = "https://qasper-dataset.s3.us-west-2.amazonaws.com/qasper-test-and-evaluator-v0.3.tgz"
 
@@ -23,73 +34,111 @@ def _ensure_downloaded(url: str) -> None:
     marker = _CACHE_DIR / (Path(url).stem + ".done")
     if marker.exists():
         return
-    tgz_path = _CACHE_DIR / Path(url).name
-    if not tgz_path.exists():
-        print(f"Downloading {url} ...")
-        urllib.request.urlretrieve(url, tgz_path)
-    with tarfile.open(tgz_path, "r:gz") as tar:
+    # Stream the tar straight off the HTTP body ("r|gz" needs no seek), so
+    # extraction overlaps the download and no intermediate .tgz hits disk.
+    print(f"Downloading {url} ...")
+    with urllib.request.urlopen(url) as resp, tarfile.open(fileobj=resp, mode="r|gz") as tar:
         tar.extractall(_CACHE_DIR)
     marker.touch()
 
 
-def _load_raw(split: str) -> dict:
+def _load_raw(split: str):
+    """Yield (doc_id, paper) pairs, streaming with ijson when available.
+
+    Incremental parsing keeps one paper in memory at a time instead of the
+    whole parsed tree (hundreds of MB for train). Falls back to json.load
+    when ijson isn't installed.
+    """
     filename, url = _SPLIT_FILES[split]
     _ensure_downloaded(url)
-    with open(_CACHE_DIR / filename) as f:
-        return json.load(f)
+    path = _CACHE_DIR / filename
+    try:
+        import ijson
+    except ImportError:
+        # One binary read + C parser; no decode pass over hundreds of MB.
+        with open(path, "rb") as f:
+            yield from _loads(f.read()).items()
+        return
+    with open(path, "rb") as f:
+        yield from ijson.kvitems(f, "")
 
 
 def _get_context(paper: dict) -> str:
-    """Build a single string from a paper's full_text and figures/tables."""
-    sections = []
+    """Build a single string from a paper's full_text and figures/tables.
+
+    Headers and paragraphs accumulate in one flat list joined once at the end,
+    so no per-section intermediate strings are built.
+    """
+    parts = []
     for section in paper.get("full_text", []):
-        name = section.get("section_name", "")
-        paras = section.get("paragraphs", [])
-        text = " ".join(paras)
-        sections.append(f"### {name}\n\n{text}")
+        parts.append(f"### {section.get('section_name', '')}\n")
+        parts.extend(section.get("paragraphs", []))
 
     for fig in paper.get("figures_and_tables", []):
         caption = fig.get("caption", "")
         if caption:
-            sections.append(caption)
-
-    return " ".join(sections)
+            parts.append(caption)
+
+    return " ".join(parts)
+
+
+def _process_paper(item: tuple[str, dict]) -> list[dict]:
+    """Flatten one paper into QA rows; module-level so worker processes can pickle it."""
+    doc_id, paper = item
+    context = _get_context(paper)
+    title = paper.get("title", "")
+
+    rows = []
+    for qa in paper.get("qas", []):
+        question = qa.get("question", "")
+        qa_id = qa.get("question_id", "")
+
+        answer = evidence = highlighted_evidence = None
+        for a in qa.get("answers", []):
+            ann = a.get("answer", {})
+            if ann.get("unanswerable"):
+                continue
+            spans = ann.get("extractive_spans", [])
+            if spans:
+                answer = ", ".join(spans)
+                evidence = ", ".join(ann.get("evidence", []))
+                highlighted_evidence = ", ".join(ann.get("highlighted_evidence", []))
+                break
+
+        if answer:
+            rows.append({
+                "doc_id": doc_id,
+                "title": title,
+                "context": context,
+                "qa_id": qa_id,
+                "question": question,
+                "answer": answer,
+                "evidence": evidence,
+                "highlighted_evidence": highlighted_evidence,
+            })
+    return rows
 
 
 def load_qasper_dataset(split: str = "train") -> list[dict]:
-    """Load QASPER, returning a flat list of {doc_id, title, context, qa_id, question, answer, ...}."""
-    raw = _load_raw(split)
+    """Load QASPER, returning a flat list of {doc_id, title, context, qa_id, question, answer, ...}.
+
+    Papers flatten independently, so the CPU-bound context joins fan out over
+    a process pool. The flattened list is pickled next to the raw files, so
+    repeat runs skip the JSON parse and context joins entirely.
+    """
+    flat_path = _CACHE_DIR / f"qasper-{split}-flat-v{_FLAT_VERSION}.pkl"
+    if flat_path.exists():
+        with open(flat_path, "rb") as f:
+            return pickle.load(f)
 
     out = []
-    for doc_id, paper in raw.items():
-        context = _get_context(paper)
-        title = paper.get("title", "")
-
-        for qa in paper.get("qas", []):
-            question = qa.get("question", "")
-            qa_id = qa.get("question_id", "")
-
-            answer = evidence = highlighted_evidence = None
-            for a in qa.get("answers", []):
-                ann = a.get("answer", {})
-                if ann.get("unanswerable"):
-                    continue
-                spans = ann.get("extractive_spans", [])
-                if spans:
-                    answer = ", ".join(spans)
-                    evidence = ", ".join(ann.get("evidence", []))
-                    highlighted_evidence = ", ".join(ann.get("highlighted_evidence", []))
-                    break
-
-            if answer:
-                out.append({
-                    "doc_id": doc_id,
-                    "title": title,
-                    "context": context,
-                    "qa_id": qa_id,
-                    "question": question,
-                    "answer": answer,
-                    "evidence": evidence,
-                    "highlighted_evidence": highlighted_evidence,
-                })
+    with ProcessPoolExecutor() as pool:
+        for rows in pool.map(_process_paper, _load_raw(split), chunksize=16):
+            out.extend(rows)
+
+    # Write-then-rename so a crash mid-dump never leaves a truncated cache.
+    tmp_path = flat_path.with_suffix(f".tmp.{os.getpid()}")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(out, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, flat_path)
     return out
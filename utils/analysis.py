@@ -14,12 +14,40 @@ from __future__ import annotations
 import argparse
 import csv
 import json
+import mmap
 import os
+import re
 import sys
-from dataclasses import dataclass, field
-from glob import glob
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Above this size, map the file instead of copying it into one bytes object.
+_MMAP_THRESHOLD = 1 << 20
+
+# Usage counters as written by RunLogger — key order is stable, so a byte
+# regex can pull the two ints without parsing each record.
+_USAGE_RE = re.compile(rb'"input_tokens"\s*:\s*(\d+)\s*,\s*"output_tokens"\s*:\s*(\d+)')
+
+
+def _iter_lines(data):
+    """Yield newline-delimited slices from a bytes or mmap buffer."""
+    find = data.find
+    start = 0
+    end = find(b"\n", start)
+    while end != -1:
+        yield data[start:end]
+        start = end + 1
+        end = find(b"\n", start)
+    if start < len(data):
+        yield data[start:]
+
 
 @dataclass
 class TokenStats:
@@ -48,73 +76,146 @@ class RunStats:
         return self.total_steps / self.total if self.total else 0.0
 
 
-def _read_jsonl_usage(path: str) -> TokenStats:
-    """Sum token usage across all entries in a JSONL log file."""
-    stats = TokenStats()
-    if not os.path.exists(path):
-        return stats
-    with open(path) as f:
-        for line in f:
-            usage = json.loads(line).get("usage", {})
-            stats.input_tokens += usage.get("input_tokens", 0)
-            stats.output_tokens += usage.get("output_tokens", 0)
-    return stats
-
-
-def _read_model_name(path: str) -> str:
-    """Read the model name from the first entry of a JSONL log file."""
-    if not os.path.exists(path):
-        return ""
-    with open(path) as f:
-        first = f.readline()
-        if first:
-            return json.loads(first).get("model", "")
-    return ""
+def _scan_jsonl(path: str) -> tuple[str, TokenStats, int]:
+    """Single-pass scan of a JSONL log: model name, summed usage, line count.
 
-
-def _count_steps(path: str) -> int:
-    """Count supervisor steps (one per JSONL line)."""
-    if not os.path.exists(path):
-        return 0
-    with open(path) as f:
-        return sum(1 for _ in f)
+    One open + one parse per line replaces the separate model/usage/step
+    passes that each re-read the file.
+    """
+    model = ""
+    in_tokens = out_tokens = steps = 0
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return model, TokenStats(), steps
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return model, TokenStats(), steps
+        # One bulk read (or page-cache mapping) instead of buffered line reads.
+        if size > _MMAP_THRESHOLD:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = f.read()
+    # These logs come from RunLogger, so the schema is fixed: one C-level
+    # regex sweep pulls the usage ints without building a dict per record.
+    # Zero matches means schema drift; fall back to parsing every line.
+    matches = _USAGE_RE.findall(data)
+    if matches:
+        for in_b, out_b in matches:
+            in_tokens += int(in_b)
+            out_tokens += int(out_b)
+        # mmap has no count(); chase newlines with C-level find.
+        pos = data.find(b"\n")
+        while pos != -1:
+            steps += 1
+            pos = data.find(b"\n", pos + 1)
+        model = _loads(data[:data.find(b"\n")]).get("model", "")
+        return model, TokenStats(in_tokens, out_tokens), steps
+    # Accumulate in locals; attribute stores per line add up on big logs.
+    for line in _iter_lines(data):
+        entry = _loads(line)
+        if not model:
+            model = entry.get("model", "")
+        usage = entry.get("usage", {})
+        in_tokens += usage.get("input_tokens", 0)
+        out_tokens += usage.get("output_tokens", 0)
+        steps += 1
+    return model, TokenStats(in_tokens, out_tokens), steps
 
 
 def analyze_run(run_dir: str) -> RunStats | None:
-    """Analyze a single run directory containing results.csv and example subdirs."""
+    """Analyze a single run directory containing results.csv and example subdirs.
+
+    Results are memoized in `<run_dir>/.analysis_cache.json` keyed on the
+    mtimes/sizes of results.csv and the example dirs, so re-analyzing an
+    unchanged run skips the log scans entirely.
+    """
     csv_path = os.path.join(run_dir, "results.csv")
     if not os.path.exists(csv_path):
         return None
 
+    with os.scandir(run_dir) as it:
+        example_entries = [
+            e for e in it
+            if len(e.name) == 3 and e.name.isdigit() and e.is_dir(follow_symlinks=False)
+        ]
+    example_dirs = sorted(e.path for e in example_entries)
+
+    csv_stat = os.stat(csv_path)
+    cache_key = [
+        csv_stat.st_mtime_ns,
+        csv_stat.st_size,
+        len(example_dirs),
+        max((e.stat().st_mtime_ns for e in example_entries), default=0),
+    ]
+    cache_path = os.path.join(run_dir, ".analysis_cache.json")
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                cached = _loads(f.read())
+        except (ValueError, OSError):
+            cached = None
+        if cached and cached.get("key") == cache_key:
+            d = cached["stats"]
+            return RunStats(
+                supervisor=TokenStats(**d.pop("supervisor")),
+                worker=TokenStats(**d.pop("worker")),
+                **d,
+            )
+
     stats = RunStats(run_dir=run_dir)
 
-    # Read accuracy from results.csv
-    with open(csv_path) as f:
-        rows = list(csv.DictReader(f))
-    stats.total = len(rows)
-    stats.correct = sum(1 for r in rows if float(r["score"]) > 0)
+    # Read accuracy from results.csv; stream rows instead of building dicts.
+    # 128KB buffer cuts read syscalls; scores are almost always "0"/"1", so
+    # test the raw string before paying for a float() parse.
+    with open(csv_path, buffering=1 << 17, newline="") as f:
+        reader = csv.reader(f)
+        score_idx = next(reader).index("score")
+        for row in reader:
+            stats.total += 1
+            s = row[score_idx]
+            if s == "1" or (s not in ("0", "0.0", "") and float(s) > 0):
+                stats.correct += 1
     stats.accuracy = stats.correct / stats.total if stats.total else 0.0
 
-    # Aggregate from example subdirectories
-    example_dirs = sorted(glob(os.path.join(run_dir, "[0-9][0-9][0-9]")))
-    for ex_dir in example_dirs:
-        sup_file = os.path.join(ex_dir, "supervisor.jsonl")
-        wrk_file = os.path.join(ex_dir, "worker.jsonl")
-
+    # Aggregate from example subdirectories; scans are independent file reads,
+    # so fan them out over threads and reduce in order.
+    def _scan_example(ex_dir: str):
+        # One scandir enumerates the dir; no per-log stat before each open.
+        with os.scandir(ex_dir) as it:
+            names = {e.name for e in it}
+        empty = ("", TokenStats(), 0)
+        return (
+            _scan_jsonl(os.path.join(ex_dir, "supervisor.jsonl"))
+            if "supervisor.jsonl" in names else empty,
+            _scan_jsonl(os.path.join(ex_dir, "worker.jsonl"))
+            if "worker.jsonl" in names else empty,
+        )
+
+    with ThreadPoolExecutor() as pool:
+        scans = list(pool.map(_scan_example, example_dirs))
+
+    sup_in = sup_out = wrk_in = wrk_out = total_steps = 0
+    for (sup_model, sup_usage, sup_steps), (wrk_model, wrk_usage, _) in scans:
         # Model names from first example that has them
         if not stats.supervisor_model:
-            stats.supervisor_model = _read_model_name(sup_file)
+            stats.supervisor_model = sup_model
         if not stats.worker_model:
-            stats.worker_model = _read_model_name(wrk_file)
+            stats.worker_model = wrk_model
+
+        sup_in += sup_usage.input_tokens
+        sup_out += sup_usage.output_tokens
+        wrk_in += wrk_usage.input_tokens
+        wrk_out += wrk_usage.output_tokens
+        total_steps += sup_steps
 
-        sup_usage = _read_jsonl_usage(sup_file)
-        wrk_usage = _read_jsonl_usage(wrk_file)
-        stats.supervisor.input_tokens += sup_usage.input_tokens
-        stats.supervisor.output_tokens += sup_usage.output_tokens
-        stats.worker.input_tokens += wrk_usage.input_tokens
-        stats.worker.output_tokens += wrk_usage.output_tokens
-        stats.total_steps += _count_steps(sup_file)
+    stats.supervisor = TokenStats(sup_in, sup_out)
+    stats.worker = TokenStats(wrk_in, wrk_out)
+    stats.total_steps = total_steps
 
+    with open(cache_path, "w") as f:
+        json.dump({"key": cache_key, "stats": asdict(stats)}, f)
     return stats
 
 
@@ -129,12 +230,14 @@ def resolve_run_dirs(paths: list[str]) -> list[str]:
         if os.path.isfile(os.path.join(p, "results.csv")):
             run_dirs.append(p)
         elif os.path.isdir(p):
-            for child in sorted(os.listdir(p)):
-                child_path = os.path.join(p, child)
-                if os.path.isdir(child_path) and os.path.isfile(
-                    os.path.join(child_path, "results.csv")
-                ):
-                    run_dirs.append(child_path)
+            # scandir's DirEntry caches the dirent type, avoiding a stat per child.
+            with os.scandir(p) as it:
+                children = sorted(
+                    (e.path for e in it if e.is_dir(follow_symlinks=False)),
+                )
+            run_dirs.extend(
+                c for c in children if os.path.isfile(os.path.join(c, "results.csv"))
+            )
     return run_dirs
 
 
@@ -175,11 +278,8 @@ def print_table(all_stats: list[RunStats]) -> None:
             fmt_tokens(s.worker.output_tokens),
         ])
 
-    # Compute column widths
-    col_widths = [len(h) for h in headers]
-    for row in rows:
-        for i, cell in enumerate(row):
-            col_widths[i] = max(col_widths[i], len(cell))
+    # Column widths: one C-level max/map pass per column, not per cell.
+    col_widths = [max(map(len, col)) for col in zip(headers, *rows)]
 
     def fmt_row(cells: list[str]) -> str:
         parts = []
@@ -193,10 +293,9 @@ def print_table(all_stats: list[RunStats]) -> None:
 
     sep = "-+-".join("-" * w for w in col_widths)
 
-    print(fmt_row(headers))
-    print(sep)
-    for row in rows:
-        print(fmt_row(row))
+    # Emit the whole table in one write; per-row print() means a lock
+    # acquire and write syscall per line.
+    sys.stdout.write("\n".join([fmt_row(headers), sep, *map(fmt_row, rows)]) + "\n")
 
 
 def main() -> None:
@@ -215,11 +314,9 @@ def main() -> None:
         print("No run directories found.", file=sys.stderr)
         sys.exit(1)
 
-    all_stats: list[RunStats] = []
-    for d in run_dirs:
-        s = analyze_run(d)
-        if s:
-            all_stats.append(s)
+    # Runs are independent; processes sidestep the GIL for the JSON parsing.
+    with ProcessPoolExecutor() as pool:
+        all_stats = [s for s in pool.map(analyze_run, run_dirs) if s]
 
     if not all_stats:
         print("No valid results found.", file=sys.stderr)
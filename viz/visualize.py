@@ -9,21 +9,44 @@ Usage:
 """
 
 import argparse
+import base64
 import json
 import os
 import sys
 
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode()
+
 
 def read_jsonl(path):
     if not os.path.exists(path):
         return []
-    entries = []
-    with open(path) as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                entries.append(json.loads(line))
-    return entries
+    # One read + one C-level split; the io line iterator allocates per line.
+    with open(path, "rb") as f:
+        data = f.read()
+    return [_loads(line) for line in data.split(b"\n") if line.strip()]
+
+
+def reconstruct_messages(supervisor_entries):
+    """Expand delta-logged supervisor entries into full message lists.
+
+    Newer logs store only `new_messages` per step; rebuild the cumulative
+    `messages` field the template expects. Older logs with `messages` pass
+    through untouched.
+    """
+    full = []
+    for entry in supervisor_entries:
+        if "new_messages" in entry:
+            full.extend(entry["new_messages"])
+            entry["messages"] = list(full)
+    return supervisor_entries
 
 
 def read_task_jsonl(path):
@@ -31,16 +54,16 @@ def read_task_jsonl(path):
     if not os.path.exists(path):
         return None
     result = {}
-    with open(path) as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            entry = json.loads(line)
-            if entry.get("type") == "input":
-                result["input"] = entry
-            elif entry.get("type") == "output":
-                result["output"] = entry
+    with open(path, "rb") as f:
+        data = f.read()
+    for line in data.split(b"\n"):
+        if not line.strip():
+            continue
+        entry = _loads(line)
+        if entry.get("type") == "input":
+            result["input"] = entry
+        elif entry.get("type") == "output":
+            result["output"] = entry
     return result or None
 
 
@@ -51,7 +74,7 @@ def main():
     args = p.parse_args()
 
     data = {
-        "supervisor": read_jsonl(os.path.join(args.log_dir, "supervisor.jsonl")),
+        "supervisor": reconstruct_messages(read_jsonl(os.path.join(args.log_dir, "supervisor.jsonl"))),
         "worker": read_jsonl(os.path.join(args.log_dir, "worker.jsonl")),
         "repl": read_jsonl(os.path.join(args.log_dir, "repl.jsonl")),
         "task": read_task_jsonl(os.path.join(args.log_dir, "task.jsonl")),
@@ -61,19 +84,25 @@ def main():
         print(f"Error: No supervisor.jsonl found in {args.log_dir}", file=sys.stderr)
         sys.exit(1)
 
-    # Safely encode for embedding in <script> — escape HTML-breaking chars
-    data_json = json.dumps(data, ensure_ascii=False)
-    data_json = data_json.replace("<", "\\u003c").replace(">", "\\u003e")
+    # Base64 can't contain "<" or "</script>", so no HTML-escape pass over
+    # the multi-MB payload; the template decodes it with atob + JSON.parse.
+    data_b64 = base64.b64encode(_dumps(data))
 
     template_path = os.path.join(os.path.dirname(__file__), "index.html")
     with open(template_path) as f:
         template = f.read()
 
-    html = template.replace("/*__DATA__*/null", data_json)
+    # Write template-before, data, template-after as three pieces; no
+    # template+data concatenation doubling peak memory for large runs.
+    pre, post = template.split("/*__DATA_B64__*/null", 1)
 
     output = args.output or os.path.join(args.log_dir, "viz.html")
-    with open(output, "w") as f:
-        f.write(html)
+    with open(output, "wb", buffering=1 << 20) as f:
+        f.write(pre.encode())
+        f.write(b'"')
+        f.write(data_b64)
+        f.write(b'"')
+        f.write(post.encode())
     print(f"Wrote {output}")
 
 